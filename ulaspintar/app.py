@@ -1,64 +1,331 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
-import pandas as pd
+import time
+
+# Titik awal pengukuran startup (import modul atau fork worker -> siap melayani)
+_PROCESS_STARTED = time.perf_counter()
+
+from flask import Flask, render_template, request, jsonify, send_from_directory, g
 import re
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
 from collections import Counter
-import joblib
 import os
 import json
-import random
+import math
+import threading
+
+from tenancy import TenantScheduler, QueueTimeout
+
+# pandas sengaja tidak di-import di level modul karena berat dan hanya
+# dibutuhkan oleh route analisis. Gunakan get_pandas() di dalam fungsi.
 
 app = Flask(__name__, static_folder='static')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
-# Setup database dengan migration
+def get_pandas():
+    """Import pandas secara lazy (di-cache oleh sys.modules)"""
+    import pandas as pd
+    return pd
+
+_init_lock = threading.Lock()
+
+# Versi skema disimpan di PRAGMA user_version. Untuk perubahan skema,
+# tambahkan fungsi migrasi di akhir SCHEMA_MIGRATIONS.
+def _migrate_v1(cursor):
+    """Skema awal upload_history (juga menangani database lama tanpa chart_data)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS upload_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT NOT NULL,
+            upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            total_reviews INTEGER,
+            positif_count INTEGER,
+            negatif_count INTEGER,
+            netral_count INTEGER,
+            chart_data TEXT  -- Menyimpan data chart sebagai JSON
+        )
+    ''')
+    
+    # Hanya berjalan sekali, saat user_version masih 0
+    cursor.execute("PRAGMA table_info(upload_history)")
+    columns = [column[1] for column in cursor.fetchall()]
+    
+    if 'chart_data' not in columns:
+        cursor.execute('ALTER TABLE upload_history ADD COLUMN chart_data TEXT')
+        print("✅ Added chart_data column to existing table")
+
+def _migrate_v2(cursor):
+    """Partisi riwayat per tenant dan counter pemakaian tenant"""
+    cursor.execute("ALTER TABLE upload_history ADD COLUMN tenant_id TEXT NOT NULL DEFAULT 'default'")
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_upload_history_tenant
+        ON upload_history (tenant_id, upload_date)
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tenant_usage (
+            tenant_id TEXT PRIMARY KEY,
+            upload_count INTEGER NOT NULL DEFAULT 0,
+            review_count INTEGER NOT NULL DEFAULT 0,
+            rejected_count INTEGER NOT NULL DEFAULT 0,
+            last_upload TIMESTAMP
+        )
+    ''')
+
+def _migrate_v3(cursor):
+    """Indeks pencarian ulasan lintas upload (SQLite FTS5)"""
+    # Kolom tags berisi token tenant dan sentimen, sehingga filter tersebut
+    # diproses oleh indeks FTS dan tidak dicek baris per baris
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS review_fts USING fts5(
+            review,
+            tags,
+            sentiment UNINDEXED,
+            history_id UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    ''')
+    
+    # Rentang rowid review_fts per upload, dipakai untuk filter tanggal
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS review_index_batches (
+            history_id INTEGER PRIMARY KEY,
+            tenant_id TEXT NOT NULL,
+            first_id INTEGER NOT NULL,
+            last_id INTEGER NOT NULL,
+            upload_date TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_review_index_batches_tenant
+        ON review_index_batches (tenant_id, upload_date)
+    ''')
+
+def _migrate_v4(cursor):
+    """Token bucket batas laju baris per tenant, dipakai bersama semua worker"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tenant_row_buckets (
+            tenant_id TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL  -- Unix timestamp
+        )
+    ''')
+
+SCHEMA_MIGRATIONS = [
+    _migrate_v1,
+    _migrate_v2,
+    _migrate_v3,
+    _migrate_v4,
+]
+SCHEMA_VERSION = len(SCHEMA_MIGRATIONS)
+
+# Setup database dengan migration berversi
 def init_db():
     conn = sqlite3.connect('database.db')
     cursor = conn.cursor()
     
-    # Check if table exists
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='upload_history'")
-    table_exists = cursor.fetchone()
-    
-    if not table_exists:
-        # Create new table with all columns
-        cursor.execute('''
-            CREATE TABLE upload_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                filename TEXT NOT NULL,
-                upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                total_reviews INTEGER,
-                positif_count INTEGER,
-                negatif_count INTEGER,
-                netral_count INTEGER,
-                chart_data TEXT  -- Menyimpan data chart sebagai JSON
-            )
-        ''')
-        print("✅ Database table created successfully")
-    else:
-        # Check if chart_data column exists
-        cursor.execute("PRAGMA table_info(upload_history)")
-        columns = [column[1] for column in cursor.fetchall()]
-        
-        if 'chart_data' not in columns:
-            # Add missing column
-            cursor.execute('ALTER TABLE upload_history ADD COLUMN chart_data TEXT')
-            print("✅ Added chart_data column to existing table")
+    # Migrasi dan user_version ditulis dalam satu transaksi yang mengunci
+    # database, sehingga worker lain yang migrasi bersamaan menunggu lalu
+    # membaca versi terbaru, dan crash di tengah migrasi tidak meninggalkan
+    # skema setengah jadi (DDL SQLite ikut transaksi)
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        current_version = cursor.execute('PRAGMA user_version').fetchone()[0]
         
-        # Check for other missing columns (future-proofing)
-        required_columns = ['filename', 'upload_date', 'total_reviews', 
-                           'positif_count', 'negatif_count', 'netral_count', 'chart_data']
+        for version in range(current_version + 1, SCHEMA_VERSION + 1):
+            SCHEMA_MIGRATIONS[version - 1](cursor)
+            # PRAGMA tidak mendukung parameter binding
+            cursor.execute(f'PRAGMA user_version = {version}')
         
-        for column in required_columns:
-            if column not in columns and column != 'chart_data':
-                print(f"⚠️  Warning: Column {column} might be missing")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    
+    if current_version < SCHEMA_VERSION:
+        print(f"✅ Database schema migrated from version {current_version} to {SCHEMA_VERSION}")
+
+_db_ready = False
+
+def ensure_db():
+    """Jalankan migrasi sekali per proses, saat database pertama kali dipakai"""
+    global _db_ready
+    if _db_ready:
+        return
+    with _init_lock:
+        if not _db_ready:
+            init_db()
+            _db_ready = True
+
+# Multi-tenant: tenant ditentukan dari header X-API-Key, dipetakan lewat
+# ULASPINTAR_API_KEYS="key1:toko_a,key2:toko_b". Jika belum ada API key yang
+# dikonfigurasi (development), header X-Tenant-ID dipakai langsung dan
+# request tanpa header masuk ke tenant 'default' (misalnya dari web UI).
+# Setelah API key dikonfigurasi, request tanpa key ditolak kecuali
+# ULASPINTAR_ALLOW_ANONYMOUS=1 (web UI tanpa key memakai tenant 'default').
+DEFAULT_TENANT = 'default'
+TENANT_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+def _parse_api_keys(raw):
+    keys = {}
+    for pair in raw.split(','):
+        if ':' in pair:
+            key, tenant = pair.split(':', 1)
+            keys[key.strip()] = tenant.strip()
+    return keys
+
+API_KEYS = _parse_api_keys(os.environ.get('ULASPINTAR_API_KEYS', ''))
+ALLOW_ANONYMOUS = os.environ.get('ULASPINTAR_ALLOW_ANONYMOUS', '0') == '1'
+
+# Upload di atas SMALL_JOB_ROWS ulasan masuk antrian fair-share (maksimal
+# ULASPINTAR_TENANT_CONCURRENCY per tenant dan ULASPINTAR_ANALYSIS_SLOTS
+# total), lalu dianalisis di process pool agar tidak berebut GIL dengan
+# request lain. Job kecil langsung diproses di thread request, tanpa antri.
+#
+# Antrian ada di memori proses: jalankan gunicorn dengan satu worker
+# (default gunicorn.conf.py), karena setiap worker tambahan melipatgandakan
+# batas di atas. Batas laju baris disimpan di SQLite dan berlaku untuk
+# semua worker.
+SMALL_JOB_ROWS = int(os.environ.get('ULASPINTAR_SMALL_JOB_ROWS', 2000))
+ANALYSIS_QUEUE_TIMEOUT = float(os.environ.get('ULASPINTAR_QUEUE_TIMEOUT', 30))
+TENANT_ROWS_PER_MINUTE = int(os.environ.get('ULASPINTAR_TENANT_ROWS_PER_MINUTE', 200000))
+
+analysis_scheduler = TenantScheduler(
+    total_slots=int(os.environ.get('ULASPINTAR_ANALYSIS_SLOTS', 2)),
+    per_tenant_limit=int(os.environ.get('ULASPINTAR_TENANT_CONCURRENCY', 1))
+)
+
+class TenantError(Exception):
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+def get_tenant_id():
+    """Tentukan tenant dari header request"""
+    if API_KEYS:
+        api_key = request.headers.get('X-API-Key')
+        if api_key is None and ALLOW_ANONYMOUS:
+            return DEFAULT_TENANT
+        if api_key is None:
+            raise TenantError('API key diperlukan', 401)
+        if api_key not in API_KEYS:
+            raise TenantError('API key tidak valid', 401)
+        return API_KEYS[api_key]
+    
+    tenant_id = request.headers.get('X-Tenant-ID', DEFAULT_TENANT)
+    if not TENANT_ID_PATTERN.match(tenant_id):
+        raise TenantError('Tenant ID tidak valid', 400)
+    return tenant_id
+
+def record_tenant_usage(tenant_id, reviews=0, rejected=False):
+    """Update counter pemakaian tenant"""
+    ensure_db()
+    conn = sqlite3.connect('database.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        INSERT INTO tenant_usage (tenant_id, upload_count, review_count, rejected_count, last_upload)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(tenant_id) DO UPDATE SET
+            upload_count = upload_count + excluded.upload_count,
+            review_count = review_count + excluded.review_count,
+            rejected_count = rejected_count + excluded.rejected_count,
+            last_upload = COALESCE(excluded.last_upload, last_upload)
+    ''', (
+        tenant_id,
+        0 if rejected else 1,
+        reviews,
+        1 if rejected else 0,
+        None if rejected else datetime.now()
+    ))
+    
+    conn.commit()
+    conn.close()
+
+def consume_row_tokens(tenant_id, rows):
+    """Token bucket jumlah baris ulasan per tenant.
+    
+    Tiap tenant mendapat TENANT_ROWS_PER_MINUTE token yang terisi ulang
+    bertahap. Upload yang lebih besar dari kapasitas tetap diterima saat
+    bucket penuh, tetapi tenant harus menunggu sampai "hutang" barisnya
+    lunas. Return 0 jika diizinkan, atau detik tunggu (Retry-After).
+    """
+    if TENANT_ROWS_PER_MINUTE <= 0:
+        return 0
+    
+    capacity = float(TENANT_ROWS_PER_MINUTE)
+    refill_per_second = TENANT_ROWS_PER_MINUTE / 60.0
+    
+    ensure_db()
+    conn = sqlite3.connect('database.db')
+    cursor = conn.cursor()
+    
+    # Baca dan tulis bucket dalam satu kunci agar worker lain tidak
+    # memakai token yang sama
+    cursor.execute('BEGIN IMMEDIATE')
+    now = time.time()
+    row = cursor.execute(
+        'SELECT tokens, updated FROM tenant_row_buckets WHERE tenant_id = ?', (tenant_id,)
+    ).fetchone()
+    tokens, last = row or (capacity, now)
+    tokens = min(capacity, tokens + max(now - last, 0) * refill_per_second)
+    
+    needed = min(rows, capacity)
+    if tokens < needed:
+        retry_after = (needed - tokens) / refill_per_second
+    else:
+        retry_after = 0
+        tokens -= rows
+    
+    cursor.execute('''
+        INSERT INTO tenant_row_buckets (tenant_id, tokens, updated)
+        VALUES (?, ?, ?)
+        ON CONFLICT(tenant_id) DO UPDATE SET
+            tokens = excluded.tokens,
+            updated = excluded.updated
+    ''', (tenant_id, tokens, now))
     
     conn.commit()
     conn.close()
+    
+    return retry_after
 
-# Inisialisasi database
-init_db()
+def refund_row_tokens(tenant_id, rows):
+    """Kembalikan token untuk baris yang batal diproses"""
+    if TENANT_ROWS_PER_MINUTE <= 0:
+        return
+    
+    ensure_db()
+    conn = sqlite3.connect('database.db')
+    conn.execute('''
+        UPDATE tenant_row_buckets
+        SET tokens = MIN(?, tokens + ?)
+        WHERE tenant_id = ?
+    ''', (float(TENANT_ROWS_PER_MINUTE), rows, tenant_id))
+    conn.commit()
+    conn.close()
+
+def get_tenant_usage(tenant_id):
+    """Ambil counter pemakaian tenant"""
+    ensure_db()
+    conn = sqlite3.connect('database.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT upload_count, review_count, rejected_count, last_upload
+        FROM tenant_usage
+        WHERE tenant_id = ?
+    ''', (tenant_id,))
+    row = cursor.fetchone() or (0, 0, 0, None)
+    conn.close()
+    
+    return {
+        'tenant_id': tenant_id,
+        'upload_count': row[0],
+        'review_count': row[1],
+        'rejected_count': row[2],
+        'last_upload': row[3]
+    }
 
 # Kamus kata untuk Naive Bayes (diperluas)
 POSITIVE_WORDS = {
@@ -89,6 +356,57 @@ NEGATIVE_WORDS = {
     'nyesel': 2.0
 }
 
+# Kamus kata kunci aspek. Kata kunci aspek membuka span baru dalam ulasan;
+# kata-kata setelahnya dinilai sebagai opini untuk aspek tersebut sampai
+# muncul kata kunci aspek lain atau kata pembalik (ASPECT_BREAK_WORDS).
+ASPECT_KEYWORDS = {
+    'produk': {
+        'barang', 'barangnya', 'produk', 'produknya', 'bahan', 'bahannya',
+        'kualitas', 'kualitasnya', 'kain', 'kainnya', 'ukuran', 'ukurannya',
+        'size', 'warna', 'warnanya', 'jahitan', 'jahitannya', 'baju', 'bajunya',
+        'model', 'modelnya', 'item', 'itemnya', 'barangx', 'bahanx', 'bjux'
+    },
+    'pengiriman': {
+        'pengiriman', 'pengirimannya', 'kirim', 'dikirim', 'pengirim',
+        'datang', 'datangnya', 'dtg', 'dtang', 'sampai', 'sampe', 'nyampe',
+        'nyampai', 'kurir', 'kurirnya', 'ekspedisi', 'paket', 'paketnya',
+        'pketx', 'ongkir', 'delivery', 'diantar', 'antar'
+    },
+    'penjual': {
+        'seller', 'sellernya', 'penjual', 'penjualnya', 'toko', 'tokonya',
+        'admin', 'adminnya', 'owner', 'pelayanan', 'pelayanannya', 'respon',
+        'responnya', 'service', 'cs'
+    },
+    'kemasan': {
+        'kemasan', 'kemasannya', 'packing', 'packingnya', 'packaging',
+        'paking', 'pakingnya', 'bungkus', 'bungkusnya', 'dibungkus', 'kardus',
+        'kardusnya', 'kardusny', 'dus', 'dusnya', 'box', 'boxnya', 'bubble',
+        'wrap', 'plastik', 'plastiknya', 'segel'
+    }
+}
+
+ASPECT_LABELS = {
+    'produk': 'Kualitas Produk',
+    'pengiriman': 'Pengiriman & Kurir',
+    'penjual': 'Penjual & Pelayanan',
+    'kemasan': 'Kemasan'
+}
+
+ASPECT_BREAK_WORDS = {
+    'tapi', 'tp', 'tpi', 'tetapi', 'namun', 'cuma', 'cm', 'hanya',
+    'sayang', 'sayangnya', 'sedangkan', 'walaupun', 'meskipun', 'padahal'
+}
+
+# Token pengganti tanda baca akhir kalimat/klausa (. , ! ? ; dan baris baru)
+# di hasil clean_text. Bukan kata: tidak ikut scoring, hanya menutup span
+# aspek agar opini tidak terbawa ke kalimat lain.
+CLAUSE_BREAK = '|'
+
+# Lookup kata -> aspek untuk dipakai saat scoring
+ASPECT_LOOKUP = {word: aspect
+                 for aspect, words in ASPECT_KEYWORDS.items()
+                 for word in words}
+
 NEUTRAL_WORDS = {
     'biasa': 1.5, 'lumayan': 1.5, 'standar': 1.5, 'oke': 1.5, 'cukup': 1.5,
     'pas': 1.0, 'sesuai': 1.0, 'normal': 1.5, 'regular': 1.5, 'average': 1.5,
@@ -96,7 +414,11 @@ NEUTRAL_WORDS = {
     'tengah': 1.5, 'netral': 2.0, 'imbang': 1.5, 'seimbang': 1.5
 }
 
-# Implementasi Naive Bayes 
+# Kata opini (ada di salah satu kamus). summarize_aspects hanya melaporkan
+# kata-kata ini sebagai kata opini per aspek.
+OPINION_WORDS = set(POSITIVE_WORDS) | set(NEGATIVE_WORDS) | set(NEUTRAL_WORDS)
+
+# Implementasi Naive Bayes
 class SimpleNaiveBayes:
     def __init__(self):
         self.positive_prob = {}
@@ -153,6 +475,80 @@ class SimpleNaiveBayes:
             else:
                 neu_score *= 0.001
         
+        return self._decide(pos_score, neg_score, neu_score)
+    
+    def predict_with_aspects(self, words, aspect_lookup, break_words):
+        """Prediksi sentimen keseluruhan dan per aspek dalam satu kali iterasi kata.
+        
+        Return (sentimen, aspects) dengan aspects berisi tuple
+        (aspek, sentimen, kata-kata opini) untuk setiap aspek yang disebut.
+        """
+        pos_score = self.prior_positive
+        neg_score = self.prior_negative
+        neu_score = self.prior_neutral
+        
+        # aspek -> [pos, neg, neu, jumlah kata lexicon, kata-kata]
+        spans = {}
+        span = None
+        # Opini sebelum kata kunci aspek pertama dalam klausa ("penyok kardusnya")
+        pending = [1.0, 1.0, 1.0, 0, []]
+        
+        for word in words:
+            if word == CLAUSE_BREAK:
+                span = None
+                pending = [1.0, 1.0, 1.0, 0, []]
+                continue
+            
+            pos_p = self.positive_prob.get(word, 0.001)
+            neg_p = self.negative_prob.get(word, 0.001)
+            neu_p = self.neutral_prob.get(word, 0.001)
+            
+            pos_score *= pos_p
+            neg_score *= neg_p
+            neu_score *= neu_p
+            
+            aspect = aspect_lookup.get(word)
+            if aspect is not None:
+                previous = span
+                span = spans.get(aspect)
+                if span is None:
+                    span = [self.prior_positive, self.prior_negative, self.prior_neutral, 0, []]
+                    spans[aspect] = span
+                if previous is None and pending[3]:
+                    span[0] *= pending[0]
+                    span[1] *= pending[1]
+                    span[2] *= pending[2]
+                    span[3] += pending[3]
+                    span[4].extend(pending[4])
+                pending = [1.0, 1.0, 1.0, 0, []]
+                continue
+            
+            if word in break_words:
+                span = None
+                pending = [1.0, 1.0, 1.0, 0, []]
+                continue
+            
+            target = span if span is not None else pending
+            target[4].append(word)
+            # Kata di luar lexicon mengalikan ketiga kelas dengan faktor
+            # yang sama, jadi cukup hitung kata yang ada di lexicon
+            if pos_p != neg_p or neg_p != neu_p:
+                target[0] *= pos_p
+                target[1] *= neg_p
+                target[2] *= neu_p
+                target[3] += 1
+        
+        # Aspek yang disebut tanpa kata opini (misalnya "barang datang")
+        # tidak dihitung sebagai sentimen netral
+        aspects = [
+            (aspect, self._decide(s[0], s[1], s[2]), s[4])
+            for aspect, s in spans.items()
+            if s[3]
+        ]
+        
+        return self._decide(pos_score, neg_score, neu_score), aspects
+    
+    def _decide(self, pos_score, neg_score, neu_score):
         # Normalisasi scores
         total_score = pos_score + neg_score + neu_score
         if total_score > 0:
@@ -169,13 +565,129 @@ class SimpleNaiveBayes:
         
         return max(scores, key=scores.get)
 
-# Inisialisasi model Naive Bayes
-model = SimpleNaiveBayes()
-model.train(POSITIVE_WORDS, NEGATIVE_WORDS, NEUTRAL_WORDS)
+# Model Naive Bayes dilatih saat pertama kali dibutuhkan (atau saat warmup)
+_model = None
+
+# Waktu startup, dilaporkan di /health: durasi warmup (di master gunicorn),
+# import/fork sampai proses siap, dan latensi request pertama (terpisah
+# karena bergantung pada kapan request pertama datang)
+_startup_timings = {'warmup_ms': None, 'ready_ms': None, 'first_request_ms': None}
+
+# Deteksi duplikat: 'report' hanya melaporkan cluster ulasan yang hampir sama,
+# 'exclude' menilai satu ulasan per cluster dan membuang duplikat dari statistik.
+# Bisa di-override per upload lewat field form 'dedup'.
+DEDUP_MODES = ('off', 'report', 'exclude')
+DEDUP_MODE = os.environ.get('ULASPINTAR_DEDUP_MODE', 'report')
+
+_deduplicator = None
+
+def get_deduplicator():
+    """Ambil detektor MinHash/LSH (numpy di-import saat pertama dipakai)"""
+    global _deduplicator
+    if _deduplicator is None:
+        from dedup import MinHashLSH
+        _deduplicator = MinHashLSH(ignore_tokens={CLAUSE_BREAK})
+    return _deduplicator
+
+def get_model():
+    """Ambil model Naive Bayes, dilatih sekali per proses"""
+    global _model
+    if _model is None:
+        with _init_lock:
+            if _model is None:
+                nb = SimpleNaiveBayes()
+                nb.train(POSITIVE_WORDS, NEGATIVE_WORDS, NEUTRAL_WORDS)
+                _model = nb
+    return _model
+
+def warmup_analysis():
+    """Siapkan model, pandas, dan detektor duplikat (juga initializer process pool)"""
+    get_model()
+    get_pandas()
+    get_deduplicator()
+
+def warmup():
+    """Siapkan database, model, dan pandas sekaligus.
+    
+    Dipanggil di master gunicorn (preload_app) sehingga worker hasil fork
+    mewarisi state yang sudah siap secara copy-on-write.
+    """
+    started = time.perf_counter()
+    ensure_db()
+    warmup_analysis()
+    _startup_timings['warmup_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    print(f"🔥 Warmup selesai dalam {_startup_timings['warmup_ms']} ms")
+
+# Process pool untuk analisis berat, dibuat sekali per worker. Prosesnya
+# berjalan dengan prioritas CPU lebih rendah (nice) agar request kecil tetap
+# didahulukan saat CPU penuh.
+ANALYSIS_NICE = int(os.environ.get('ULASPINTAR_ANALYSIS_NICE', 10))
+
+_analysis_pool = None
+
+def _init_analysis_process():
+    if hasattr(os, 'nice'):
+        os.nice(ANALYSIS_NICE)
+    warmup_analysis()
+
+def get_analysis_pool():
+    """Ambil process pool analisis (satu proses per slot analysis_scheduler)"""
+    global _analysis_pool
+    if _analysis_pool is None:
+        with _init_lock:
+            if _analysis_pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # spawn, bukan fork: worker gthread sudah punya banyak thread
+                _analysis_pool = ProcessPoolExecutor(
+                    max_workers=analysis_scheduler.total_slots,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_analysis_process
+                )
+    return _analysis_pool
+
+def start_analysis_pool():
+    """Jalankan proses pool di background agar upload besar pertama tidak menunggu"""
+    pool = get_analysis_pool()
+    for _ in range(analysis_scheduler.total_slots):
+        pool.submit(os.getpid)
+
+def run_analysis_in_pool(*args):
+    """Jalankan analyze_reviews di process pool"""
+    global _analysis_pool
+    from concurrent.futures.process import BrokenProcessPool
+    
+    pool = get_analysis_pool()
+    try:
+        return pool.submit(analyze_reviews, *args).result()
+    except BrokenProcessPool:
+        # Proses anak mati (misalnya kehabisan memori): buat pool baru
+        # untuk upload berikutnya
+        with _init_lock:
+            if _analysis_pool is pool:
+                _analysis_pool = None
+        raise
+
+def mark_ready():
+    """Catat waktu dari import modul (atau fork worker) sampai siap menerima request.
+    
+    Dipanggil di akhir post_worker_init gunicorn, atau sebelum app.run.
+    """
+    _startup_timings['ready_ms'] = round((time.perf_counter() - _PROCESS_STARTED) * 1000, 2)
+    print(f"⏱️  Startup (pid {os.getpid()}): siap dalam {_startup_timings['ready_ms']} ms")
+
+def is_missing(value):
+    """Cek nilai kosong/NaN tanpa perlu import pandas"""
+    if value is None:
+        return True
+    try:
+        return math.isnan(value)
+    except TypeError:
+        return False
 
 def clean_text(text):
     """Membersihkan teks secara komprehensif"""
-    if pd.isna(text):
+    if is_missing(text):
         return ""
     
     text = str(text).lower()
@@ -183,83 +695,271 @@ def clean_text(text):
     # Hapus URL
     text = re.sub(r'http\S+|www\S+', '', text)
     
+    # Tanda baca akhir kalimat/klausa menjadi token CLAUSE_BREAK
+    text = re.sub(r'[.!?,;|\n]+', f' {CLAUSE_BREAK} ', text)
+    
     # Hapus karakter khusus, tanda baca, emoji
-    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'[^\w\s|]', ' ', text)
     
     # Hapus angka
     text = re.sub(r'\d+', '', text)
     
-    # Hapus spasi berlebih
-    text = re.sub(r'\s+', ' ', text).strip()
+    # Hapus spasi berlebih, gabungkan CLAUSE_BREAK yang berurutan dan buang
+    # yang ada di awal/akhir teks
+    text = re.sub(r'\s*\|[\s|]*', f' {CLAUSE_BREAK} ', text)
+    text = re.sub(r'\s+', ' ', text).strip(f' {CLAUSE_BREAK}')
     
     return text
 
-def analyze_sentiment_naive_bayes(text):
-    """Analisis sentimen menggunakan Naive Bayes"""
-    cleaned_text = clean_text(text)
-    if not cleaned_text.strip():
-        return 'netral'
-    
-    return model.predict(cleaned_text)
+def analyze_review(cleaned_text):
+    """Analisis sentimen dan aspek dari teks yang sudah dibersihkan"""
+    return get_model().predict_with_aspects(
+        cleaned_text.split(), ASPECT_LOOKUP, ASPECT_BREAK_WORDS
+    )
 
-def rating_to_sentiment(rating):
-    """Convert rating 1-5 ke sentimen"""
-    if pd.isna(rating):
-        return 'netral'
+def summarize_aspects(review_aspects, top_n=5):
+    """Agregasi hasil aspek per ulasan menjadi jumlah sentimen dan kata opini per aspek"""
+    mentions = Counter()
+    sentiment_counts = {aspect: Counter() for aspect in ASPECT_KEYWORDS}
+    words = {aspect: Counter() for aspect in ASPECT_KEYWORDS}
     
-    try:
-        rating = float(rating)
-        if rating >= 4:
-            return 'positif'
-        elif rating >= 2:
-            return 'netral'
-        else:
-            return 'negatif'
-    except:
-        return 'netral'
+    for aspects in review_aspects:
+        for aspect, sentiment, span_words in aspects:
+            mentions[aspect] += 1
+            sentiment_counts[aspect][sentiment] += 1
+            words[aspect].update(word for word in span_words if word in OPINION_WORDS)
+    
+    return {
+        aspect: {
+            'label': ASPECT_LABELS[aspect],
+            'mentions': mentions[aspect],
+            'sentiment_counts': {
+                'positif': sentiment_counts[aspect]['positif'],
+                'negatif': sentiment_counts[aspect]['negatif'],
+                'netral': sentiment_counts[aspect]['netral']
+            },
+            'keywords': words[aspect].most_common(top_n)
+        }
+        for aspect in ASPECT_KEYWORDS
+        if mentions[aspect] > 0
+    }
+
+# Kode sentimen int8 untuk pipeline upload. Urutan label mengikuti chart.
+SENTIMENT_LABELS = ('positif', 'negatif', 'netral')
+POSITIF, NEGATIF, NETRAL = 0, 1, 2
+SENTIMENT_CODES = {label: code for code, label in enumerate(SENTIMENT_LABELS)}
 
-def combine_sentiment(text_sentiment, rating_sentiment):
-    """Kombinasi sentimen dari teks dan rating"""
-    if text_sentiment == rating_sentiment:
-        return text_sentiment
+def ratings_to_sentiment_codes(ratings):
+    """Convert array rating 1-5 (float) ke kode sentimen int8.
     
-    # Prioritas: jika salah satu negatif, hasil negatif
-    if text_sentiment == 'negatif' or rating_sentiment == 'negatif':
-        return 'negatif'
+    Rating >= 4 positif, < 2 negatif, selebihnya (termasuk NaN) netral.
+    """
+    import numpy as np
     
-    # Jika salah satu positif dan lainnya netral, hasil positif
-    if text_sentiment == 'positif' or rating_sentiment == 'positif':
-        return 'positif'
+    codes = np.full(len(ratings), NETRAL, dtype=np.int8)
+    # NaN tidak lolos kedua perbandingan sehingga tetap netral
+    codes[ratings >= 4] = POSITIF
+    codes[ratings < 2] = NEGATIF
+    return codes
+
+def combine_sentiment_codes(text_codes, rating_codes):
+    """Kombinasi kode sentimen dari teks dan rating.
+    
+    Prioritas: jika salah satu negatif, hasil negatif; jika salah satu
+    positif dan lainnya netral, hasil positif.
+    """
+    import numpy as np
     
-    return 'netral'
+    negative = (text_codes == NEGATIF) | (rating_codes == NEGATIF)
+    positive = (text_codes == POSITIF) | (rating_codes == POSITIF)
+    return np.where(negative, NEGATIF, np.where(positive, POSITIF, NETRAL)).astype(np.int8)
 
-def save_upload_history(filename, stats, chart_data=None):
-    """Simpan riwayat upload ke database"""
+def save_upload_history(filename, stats, chart_data=None, tenant_id=DEFAULT_TENANT,
+                        reviews=None, sentiments=None):
+    """Simpan riwayat upload ke database, return id riwayat.
+    
+    Jika `reviews` diberikan, ulasan juga ditambahkan ke indeks pencarian
+    (lihat index_reviews).
+    """
+    ensure_db()
     conn = sqlite3.connect('database.db')
     cursor = conn.cursor()
     
     # Convert chart_data to JSON string if it exists
     chart_data_json = json.dumps(chart_data) if chart_data else None
     
+    # Kunci tulis sejak awal: tanggal upload dan rentang rowid indeks
+    # dialokasikan dalam kunci yang sama, sehingga urutan rowid selalu
+    # mengikuti urutan tanggal upload (dipakai filter tanggal /search).
+    # Transaksi ini pendek; ulasannya diindeks setelah commit.
+    cursor.execute('BEGIN IMMEDIATE')
+    upload_date = datetime.now()
+    
     cursor.execute('''
-        INSERT INTO upload_history 
-        (filename, upload_date, total_reviews, positif_count, negatif_count, netral_count, chart_data)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+        INSERT INTO upload_history
+        (tenant_id, filename, upload_date, total_reviews, positif_count, negatif_count, netral_count, chart_data)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
     ''', (
+        tenant_id,
         filename,
-        datetime.now(),
+        upload_date,
         stats['total'],
         stats.get('positif', 0),
         stats.get('negatif', 0),
         stats.get('netral', 0),
         chart_data_json
     ))
+    history_id = cursor.lastrowid
+    
+    first_id = None
+    if reviews is not None:
+        first_id = reserve_index_range(cursor, history_id, tenant_id, upload_date, len(reviews))
     
     conn.commit()
+    
+    if first_id is not None:
+        # Gagal mengindeks tidak boleh menggagalkan upload; riwayat tetap
+        # tersimpan, hanya ulasan upload ini yang dihapus dari indeks
+        try:
+            index_reviews(conn, history_id, first_id, tenant_id, reviews, sentiments)
+        except sqlite3.Error as e:
+            print(f"⚠️  Gagal mengindeks ulasan upload {history_id}: {e}")
+            conn.rollback()
+            try:
+                delete_upload_index(conn, history_id)
+            except sqlite3.Error as e:
+                print(f"⚠️  Gagal menghapus indeks upload {history_id}: {e}")
+    
     conn.close()
+    
+    return history_id
+
+# Indeks pencarian: setiap ulasan yang dianalisis disimpan ke review_fts
+SEARCH_INDEX_ENABLED = os.environ.get('ULASPINTAR_SEARCH_INDEX', '1') == '1'
+SEARCH_MAX_PER_PAGE = 100
+# Ulasan diindeks per chunk, masing-masing dalam transaksi sendiri, agar
+# kunci tulis database tidak ditahan selama seluruh upload diindeks
+# (sekitar 12 ms per 2000 ulasan). Jeda antar chunk memberi giliran ke
+# writer lain; indexing jadi sedikit lebih lama (150k ulasan: 1,6 -> 2,4 detik)
+SEARCH_INDEX_CHUNK_ROWS = 2000
+SEARCH_INDEX_PAUSE = 0.01
+# Ukuran indeks (semua tenant) hanya dilaporkan di /health. Dihitung lewat
+# dbstat yang membaca semua halaman, jadi di-cache
+SEARCH_SIZE_CACHE_SECONDS = 60
+
+_search_size_cache = {'expires': 0, 'size_bytes': None}
+
+def _tenant_tag(tenant_id):
+    # Tokenizer FTS memecah '.', '-', dan '_', jadi tenant ditulis sebagai hex
+    return 'tenant' + tenant_id.encode('utf-8').hex()
+
+def _sentiment_tag(sentiment):
+    return 'sentimen' + sentiment
+
+def reserve_index_range(cursor, history_id, tenant_id, upload_date, count):
+    """Catat rentang rowid review_fts untuk ulasan satu upload, return rowid pertama.
+    
+    Harus dipanggil di dalam transaksi BEGIN IMMEDIATE (lihat save_upload_history).
+    """
+    first_id = cursor.execute(
+        'SELECT COALESCE(MAX(last_id), 0) + 1 FROM review_index_batches'
+    ).fetchone()[0]
+    
+    cursor.execute('''
+        INSERT INTO review_index_batches (history_id, tenant_id, first_id, last_id, upload_date)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (history_id, tenant_id, first_id, first_id + count - 1, upload_date))
+    
+    return first_id
 
-def get_upload_history():
+def index_reviews(conn, history_id, first_id, tenant_id, reviews, sentiments):
+    """Tambahkan ulasan satu upload ke rentang rowid yang sudah dicatat (inkremental).
+    
+    Setiap SEARCH_INDEX_CHUNK_ROWS ulasan di-commit terpisah. Berhenti jika
+    riwayat tenant dihapus (clear_history) di tengah proses.
+    """
+    cursor = conn.cursor()
+    tenant_tag = _tenant_tag(tenant_id)
+    
+    for start in range(0, len(reviews), SEARCH_INDEX_CHUNK_ROWS):
+        cursor.execute('BEGIN IMMEDIATE')
+        reserved = cursor.execute(
+            'SELECT 1 FROM review_index_batches WHERE history_id = ?', (history_id,)
+        ).fetchone()
+        if reserved is None:
+            conn.rollback()
+            return
+        
+        chunk = zip(reviews[start:start + SEARCH_INDEX_CHUNK_ROWS],
+                    sentiments[start:start + SEARCH_INDEX_CHUNK_ROWS])
+        cursor.executemany('''
+            INSERT INTO review_fts (rowid, review, tags, sentiment, history_id)
+            VALUES (?, ?, ?, ?, ?)
+        ''', ((first_id + start + i, str(review), f'{tenant_tag} {_sentiment_tag(sentiment)}', sentiment, history_id)
+              for i, (review, sentiment) in enumerate(chunk)))
+        conn.commit()
+        # Busy handler SQLite menunggu sambil tidur, jadi kunci yang langsung
+        # diambil lagi membuat writer lain tidak pernah kebagian
+        time.sleep(SEARCH_INDEX_PAUSE)
+
+def delete_upload_index(conn, history_id):
+    """Hapus ulasan satu upload dari indeks pencarian"""
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    batch = cursor.execute(
+        'SELECT first_id, last_id FROM review_index_batches WHERE history_id = ?', (history_id,)
+    ).fetchone()
+    if batch is not None:
+        cursor.execute('DELETE FROM review_fts WHERE rowid BETWEEN ? AND ?', batch)
+        cursor.execute('DELETE FROM review_index_batches WHERE history_id = ?', (history_id,))
+    conn.commit()
+
+def delete_indexed_reviews(cursor, tenant_id):
+    """Hapus ulasan milik tenant dari indeks pencarian"""
+    cursor.execute('''
+        DELETE FROM review_fts
+        WHERE rowid IN (SELECT rowid FROM review_fts WHERE review_fts MATCH ?)
+    ''', (f'tags : "{_tenant_tag(tenant_id)}"',))
+    cursor.execute('DELETE FROM review_index_batches WHERE tenant_id = ?', (tenant_id,))
+
+def build_fts_query(terms, match_all=False):
+    """Ubah input bebas menjadi query FTS5 yang aman (tiap kata di-quote)"""
+    words = re.findall(r'\w+', terms.lower())
+    operator = ' AND ' if match_all else ' OR '
+    return operator.join(f'"{word}"' for word in words)
+
+def get_indexed_review_count(cursor, tenant_id):
+    """Jumlah ulasan terindeks milik tenant (termasuk upload yang sedang diindeks)"""
+    return cursor.execute('''
+        SELECT COALESCE(SUM(last_id - first_id + 1), 0)
+        FROM review_index_batches
+        WHERE tenant_id = ?
+    ''', (tenant_id,)).fetchone()[0]
+
+def get_search_index_size():
+    """Ukuran indeks pencarian di disk (byte, semua tenant), atau None"""
+    if not os.path.exists('database.db'):
+        return None
+    
+    if time.monotonic() >= _search_size_cache['expires']:
+        conn = sqlite3.connect('database.db')
+        try:
+            # dbstat tidak selalu tersedia di build SQLite
+            size_bytes = conn.execute('''
+                SELECT SUM(pgsize) FROM dbstat
+                WHERE aggregate = TRUE AND name LIKE 'review_fts%'
+            ''').fetchone()[0] or 0
+        except sqlite3.OperationalError:
+            size_bytes = None
+        conn.close()
+        _search_size_cache['size_bytes'] = size_bytes
+        _search_size_cache['expires'] = time.monotonic() + SEARCH_SIZE_CACHE_SECONDS
+    
+    return _search_size_cache['size_bytes']
+
+def get_upload_history(tenant_id=DEFAULT_TENANT):
     """Ambil riwayat upload dari database"""
+    ensure_db()
     conn = sqlite3.connect('database.db')
     cursor = conn.cursor()
     
@@ -269,20 +969,22 @@ def get_upload_history():
             SELECT id, filename, upload_date, total_reviews, 
                    positif_count, negatif_count, netral_count,
                    chart_data
-            FROM upload_history 
-            ORDER BY upload_date DESC 
+            FROM upload_history
+            WHERE tenant_id = ?
+            ORDER BY upload_date DESC
             LIMIT 10
-        ''')
+        ''', (tenant_id,))
     except sqlite3.OperationalError as e:
         # If error, try without chart_data column
         if 'no such column: chart_data' in str(e):
             cursor.execute('''
                 SELECT id, filename, upload_date, total_reviews, 
                        positif_count, negatif_count, netral_count
-                FROM upload_history 
-                ORDER BY upload_date DESC 
+                FROM upload_history
+                WHERE tenant_id = ?
+                ORDER BY upload_date DESC
                 LIMIT 10
-            ''')
+            ''', (tenant_id,))
         else:
             raise e
     
@@ -348,22 +1050,19 @@ def generate_chart_data(sentiment_counts, sentiment_percentages):
 
 def extract_word_frequency(texts, top_n=15):
     """Ekstrak frekuensi kata untuk word cloud"""
-    all_text = ' '.join(texts)
-    words = all_text.split()
-    
     # Filter kata umum dan pendek
     stopwords = {'yang', 'dan', 'di', 'ke', 'dari', 'untuk', 'dengan', 
                 'ini', 'itu', 'saya', 'kamu', 'kami', 'mereka', 'ada',
                 'tidak', 'bukan', 'akan', 'sudah', 'belum', 'pernah',
                 'saja', 'hanya', 'bisa', 'dapat', 'mau', 'ingin'}
     
-    words = [word for word in words 
-            if len(word) > 2 
-            and word not in stopwords
-            and not word.isdigit()]
-    
-    # Hitung frekuensi
-    word_freq = Counter(words)
+    # Hitung frekuensi per ulasan, tanpa menggabungkan semua teks
+    word_freq = Counter()
+    for text in texts:
+        word_freq.update(word for word in text.split()
+                         if len(word) > 2
+                         and word not in stopwords
+                         and not word.isdigit())
     
     # Ambil top N kata
     top_words = word_freq.most_common(top_n)
@@ -374,6 +1073,21 @@ def extract_word_frequency(texts, top_n=15):
         'colors': ['rgba(102, 126, 234, 0.6)' for _ in top_words]
     }
 
+# Latensi request pertama per proses (termasuk inisialisasi lazy yang
+# belum dilakukan warmup)
+@app.before_request
+def start_first_request_timer():
+    if _startup_timings['first_request_ms'] is None:
+        g.first_request_started = time.perf_counter()
+
+@app.after_request
+def record_first_request(response):
+    started = g.pop('first_request_started', None)
+    if started is not None and _startup_timings['first_request_ms'] is None:
+        _startup_timings['first_request_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        print(f"⏱️  Request pertama (pid {os.getpid()}): {_startup_timings['first_request_ms']} ms")
+    return response
+
 @app.route('/')
 def home():
     return render_template('home.html')
@@ -382,7 +1096,7 @@ def home():
 def analyze():
     # Ambil riwayat untuk ditampilkan di halaman analisis
     try:
-        history = get_upload_history()
+        history = get_upload_history(get_tenant_id())
     except Exception as e:
         print(f"⚠️  Error getting history: {e}")
         history = []
@@ -393,9 +1107,196 @@ def analyze():
 def contact():
     return render_template('contact.html')
 
+def analyze_reviews(reviews, ratings, dedup_mode):
+    """Analisis sentimen, aspek, dan duplikat untuk satu upload.
+    
+    `reviews` adalah array teks ulasan mentah dan `ratings` array rating
+    float (atau None). Tidak menyentuh database, sehingga upload besar bisa
+    dijalankan di process pool (run_analysis_in_pool).
+    
+    Return (results, kept, codes): hasil analisis untuk response, posisi
+    ulasan di `reviews` yang dinilai, dan kode sentimennya. Return None jika
+    tidak ada ulasan valid setelah pembersihan.
+    """
+    pd = get_pandas()
+    import numpy as np
+    
+    has_rating = ratings is not None
+    
+    # Preprocessing. Setelah ini pipeline memakai array/list per kolom,
+    # bukan DataFrame, agar kolom yang sudah tidak dipakai bisa dibuang.
+    cleaned = [clean_text(review) for review in reviews.tolist()]
+    valid = np.fromiter(map(bool, cleaned), dtype=bool, count=len(cleaned))
+    
+    if not valid.any():
+        return None
+    
+    kept = np.flatnonzero(valid)
+    cleaned = [cleaned[i] for i in kept.tolist()]
+    reviews = reviews[kept]
+    if has_rating:
+        ratings = ratings[kept]
+    
+    # Deteksi ulasan duplikat / template dengan MinHash + LSH
+    duplicates = None
+    if dedup_mode != 'off':
+        from dedup import summarize_clusters, unique_mask
+        
+        representative = get_deduplicator().cluster(cleaned)
+        duplicates = summarize_clusters(representative, reviews)
+        duplicates['mode'] = dedup_mode
+        duplicates['total_rows'] = len(cleaned)
+        
+        if dedup_mode == 'exclude':
+            keep = unique_mask(representative)
+            cleaned = [text for text, unique in zip(cleaned, keep.tolist()) if unique]
+            reviews = reviews[keep]
+            kept = kept[keep]
+            if has_rating:
+                # Ulasan yang disimpan mewakili seluruh cluster, jadi
+                # ratingnya adalah median rating anggota cluster (NaN
+                # diabaikan), bukan rating milik anggota yang kebetulan
+                # muncul pertama. Key groupby terurut = posisi yang disimpan.
+                ratings = pd.Series(ratings).groupby(representative).median().to_numpy()
+    
+    total = len(cleaned)
+    
+    # Analisis sentimen dan aspek menggunakan Naive Bayes dalam satu pass.
+    # Sentimen disimpan sebagai kode int8, hasil aspek langsung diagregasi.
+    text_codes = np.empty(total, dtype=np.int8)
+    
+    def score_reviews():
+        for i, text in enumerate(cleaned):
+            sentiment, review_aspects = analyze_review(text)
+            text_codes[i] = SENTIMENT_CODES[sentiment]
+            yield review_aspects
+    
+    aspects = summarize_aspects(score_reviews())
+    
+    # Jika ada rating, gabungkan sentimen teks dengan sentimen dari rating
+    if has_rating:
+        codes = combine_sentiment_codes(text_codes, ratings_to_sentiment_codes(ratings))
+    else:
+        codes = text_codes
+    
+    # Hitung statistik
+    counts = np.bincount(codes, minlength=len(SENTIMENT_LABELS))
+    sentiment_counts = {SENTIMENT_LABELS[code]: int(counts[code])
+                        for code in np.argsort(-counts, kind='stable')
+                        if counts[code] > 0}
+    sentiment_percentages = {k: round(v/total*100, 2) for k, v in sentiment_counts.items()}
+    
+    # Generate chart data
+    chart_data = generate_chart_data(sentiment_counts, sentiment_percentages)
+    
+    # Ekstrak keywords (tanpa stopwords manual)
+    def get_top_words(texts, n=10):
+        word_freq = Counter()
+        for text in texts:
+            # Filter kata pendek
+            word_freq.update(word for word in text.split() if len(word) > 2)
+        return word_freq.most_common(n)
+    
+    keywords = {}
+    for code, sentiment in enumerate(SENTIMENT_LABELS):
+        if counts[code] > 0:
+            texts = (cleaned[i] for i in np.flatnonzero(codes == code).tolist())
+            keywords[sentiment] = get_top_words(texts, 10)
+    
+    # Word frequency data untuk chart
+    word_freq_data = extract_word_frequency(cleaned)
+    del cleaned
+    
+    # Generate summary
+    positive_pct = sentiment_percentages.get('positif', 0)
+    negative_pct = sentiment_percentages.get('negatif', 0)
+    
+    # Aspek dengan keluhan (ulasan negatif) terbanyak
+    worst_aspect = max(
+        (a for a in aspects.values() if a['sentiment_counts']['negatif'] > 0),
+        key=lambda a: a['sentiment_counts']['negatif'],
+        default=None
+    )
+    
+    if positive_pct >= 70:
+        summary = f"✅ SANGAT BAIK - Produk memiliki {positive_pct}% ulasan positif."
+        recommendation = "Pertahankan kualitas produk dan layanan. Pertimbangkan untuk menambah stok atau variasi produk."
+    elif positive_pct >= 50:
+        summary = f"⚠️ CUKUP BAIK - Produk memiliki {positive_pct}% ulasan positif."
+        recommendation = f"Perbaiki area dengan ulasan negatif ({negative_pct}%). Fokus pada kata kunci negatif di atas."
+        if worst_aspect:
+            recommendation += f" Keluhan terbanyak ada pada aspek {worst_aspect['label']} ({worst_aspect['sentiment_counts']['negatif']} ulasan)."
+    else:
+        summary = f"❌ PERLU PERHATIAN - Hanya {positive_pct}% ulasan positif."
+        if worst_aspect:
+            recommendation = f"Lakukan evaluasi mendalam, terutama pada aspek {worst_aspect['label']} ({worst_aspect['sentiment_counts']['negatif']} ulasan negatif)."
+        else:
+            recommendation = "Lakukan evaluasi mendalam. Perbaiki kualitas produk, kemasan, atau layanan pengiriman."
+    
+    # Ambil sample ulasan
+    samples = [{'review': review, 'sentiment': SENTIMENT_LABELS[code]}
+               for review, code in zip(reviews[:10].tolist(), codes[:10].tolist())]
+    
+    # Hitung akurasi jika ada rating
+    accuracy_info = None
+    if has_rating:
+        # Bandingkan sentiment dengan rating untuk estimasi akurasi
+        matches = int(np.count_nonzero(
+            ((codes == POSITIF) & (ratings >= 4)) |
+            ((codes == NEGATIF) & (ratings <= 2)) |
+            ((codes == NETRAL) & (ratings >= 2.5) & (ratings <= 3.5))
+        ))
+        estimated_accuracy = round((matches / total) * 100, 2) if total > 0 else 0
+        accuracy_info = {
+            'estimated_accuracy': estimated_accuracy,
+            'matches': matches,
+            'total_compared': total
+        }
+    
+    results = {
+        # Basic statistics
+        'total_reviews': total,
+        'sentiment_counts': sentiment_counts,
+        'sentiment_percentages': sentiment_percentages,
+        
+        # Chart data
+        'chart_data': chart_data,
+        'word_freq_data': word_freq_data,
+        
+        # Keywords
+        'keywords': keywords,
+        
+        # Sentimen per aspek
+        'aspects': aspects,
+        
+        # Ulasan duplikat
+        'duplicates': duplicates,
+        
+        # Summary
+        'summary': summary,
+        'recommendation': recommendation,
+        
+        # Samples
+        'samples': samples,
+        'has_rating': has_rating,
+        'accuracy_info': accuracy_info
+    }
+    
+    return results, kept, codes
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
+    pd = get_pandas()
+    import numpy as np
+    tenant_id = DEFAULT_TENANT
+    ticket = None
+    # Baris yang sudah dipotong dari batas laju; dikembalikan jika upload gagal
+    charged_rows = 0
+    completed = False
+    
     try:
+        tenant_id = get_tenant_id()
+        
         if 'file' not in request.files:
             return jsonify({'error': 'File tidak ditemukan'}), 400
         
@@ -407,137 +1308,80 @@ def upload_file():
         if not file.filename.endswith('.csv'):
             return jsonify({'error': 'File harus berformat CSV'}), 400
         
-        # Baca file CSV
-        df = pd.read_csv(file, encoding='utf-8')
+        dedup_mode = request.form.get('dedup', DEDUP_MODE)
+        if dedup_mode not in DEDUP_MODES:
+            return jsonify({'error': 'Mode dedup harus off, report, atau exclude'}), 400
+
+        # Baca file CSV, hanya kolom yang dipakai
+        df = pd.read_csv(file, encoding='utf-8', usecols=lambda column: column in ('review', 'rating'))
         
         # Validasi kolom
         if 'review' not in df.columns:
             return jsonify({'error': 'CSV harus memiliki kolom "review"'}), 400
         
+        # Batas laju jumlah ulasan per tenant
+        retry_after = consume_row_tokens(tenant_id, len(df))
+        if retry_after:
+            record_tenant_usage(tenant_id, rejected=True)
+            response = jsonify({'error': 'Batas jumlah ulasan per menit untuk tenant ini terlampaui'})
+            response.headers['Retry-After'] = str(math.ceil(retry_after))
+            return response, 429
+        charged_rows = len(df)
+        
         # Cek apakah ada kolom rating
         has_rating = 'rating' in df.columns
         
-        # Preprocessing
-        df['cleaned_review'] = df['review'].apply(clean_text)
-        df = df[df['cleaned_review'].str.len() > 0]
-        
-        if len(df) == 0:
-            return jsonify({'error': 'Tidak ada ulasan valid setelah pembersihan'}), 400
+        reviews = df['review'].to_numpy()
+        ratings = pd.to_numeric(df['rating'], errors='coerce').to_numpy(dtype=np.float64) if has_rating else None
+        del df
         
-        # Analisis sentimen menggunakan Naive Bayes 
-        df['text_sentiment'] = df['cleaned_review'].apply(analyze_sentiment_naive_bayes)
-        
-        # Jika ada rating, konversi rating ke sentimen
-        if has_rating:
-            df['rating_sentiment'] = df['rating'].apply(rating_to_sentiment)
-            # Gabungkan sentimen dari teks dan rating
-            df['sentiment'] = df.apply(
-                lambda row: combine_sentiment(row['text_sentiment'], row['rating_sentiment']), 
-                axis=1
-            )
+        # Job besar antri secara fair-share antar tenant dan dianalisis di
+        # process pool; job kecil langsung dianalisis di thread ini
+        if len(reviews) > SMALL_JOB_ROWS:
+            ticket = analysis_scheduler.acquire(tenant_id, timeout=ANALYSIS_QUEUE_TIMEOUT)
+            analysis = run_analysis_in_pool(reviews, ratings, dedup_mode)
         else:
-            df['sentiment'] = df['text_sentiment']
+            analysis = analyze_reviews(reviews, ratings, dedup_mode)
         
-        # Hitung statistik
-        sentiment_counts = df['sentiment'].value_counts().to_dict()
-        total = len(df)
-        sentiment_percentages = {k: round(v/total*100, 2) for k, v in sentiment_counts.items()}
-        
-        # Generate chart data
-        chart_data = generate_chart_data(sentiment_counts, sentiment_percentages)
-        
-        # Ekstrak keywords (tanpa stopwords manual)
-        def get_top_words(texts, n=10):
-            all_words = ' '.join(texts).split()
-            # Filter kata pendek
-            words = [word for word in all_words if len(word) > 2]
-            word_freq = Counter(words)
-            return word_freq.most_common(n)
-        
-        keywords = {}
-        for sentiment in ['positif', 'negatif', 'netral']:
-            if sentiment in df['sentiment'].values:
-                texts = list(df[df['sentiment'] == sentiment]['cleaned_review'])
-                keywords[sentiment] = get_top_words(texts, 10)
-        
-        # Word frequency data untuk chart
-        all_texts = list(df['cleaned_review'])
-        word_freq_data = extract_word_frequency(all_texts)
-        
-        # Generate summary
-        positive_pct = sentiment_percentages.get('positif', 0)
-        negative_pct = sentiment_percentages.get('negatif', 0)
-        
-        if positive_pct >= 70:
-            summary = f"✅ SANGAT BAIK - Produk memiliki {positive_pct}% ulasan positif."
-            recommendation = "Pertahankan kualitas produk dan layanan. Pertimbangkan untuk menambah stok atau variasi produk."
-        elif positive_pct >= 50:
-            summary = f"⚠️ CUKUP BAIK - Produk memiliki {positive_pct}% ulasan positif."
-            recommendation = f"Perbaiki area dengan ulasan negatif ({negative_pct}%). Fokus pada kata kunci negatif di atas."
-        else:
-            summary = f"❌ PERLU PERHATIAN - Hanya {positive_pct}% ulasan positif."
-            recommendation = "Lakukan evaluasi mendalam. Perbaiki kualitas produk, kemasan, atau layanan pengiriman."
+        if analysis is None:
+            return jsonify({'error': 'Tidak ada ulasan valid setelah pembersihan'}), 400
         
-        # Ambil sample ulasan
-        samples = df[['review', 'sentiment']].head(10).to_dict('records')
+        results, kept, codes = analysis
+        sentiment_counts = results['sentiment_counts']
         
         # Simpan ke database
         stats = {
-            'total': total,
+            'total': results['total_reviews'],
             'positif': sentiment_counts.get('positif', 0),
             'negatif': sentiment_counts.get('negatif', 0),
             'netral': sentiment_counts.get('netral', 0)
         }
-        save_upload_history(file.filename, stats, chart_data)
-        
-        # Hitung akurasi jika ada rating
-        accuracy_info = None
-        if has_rating:
-            # Bandingkan sentiment dengan rating untuk estimasi akurasi
-            matches = sum(1 for i in range(len(df)) 
-                         if (df['sentiment'].iloc[i] == 'positif' and df['rating'].iloc[i] >= 4) or
-                            (df['sentiment'].iloc[i] == 'negatif' and df['rating'].iloc[i] <= 2) or
-                            (df['sentiment'].iloc[i] == 'netral' and 2.5 <= df['rating'].iloc[i] <= 3.5))
-            estimated_accuracy = round((matches / len(df)) * 100, 2) if len(df) > 0 else 0
-            accuracy_info = {
-                'estimated_accuracy': estimated_accuracy,
-                'matches': matches,
-                'total_compared': len(df)
-            }
+        if SEARCH_INDEX_ENABLED:
+            save_upload_history(file.filename, stats, results['chart_data'], tenant_id,
+                                reviews=reviews[kept].tolist(),
+                                sentiments=[SENTIMENT_LABELS[code] for code in codes.tolist()])
+        else:
+            save_upload_history(file.filename, stats, results['chart_data'], tenant_id)
+        record_tenant_usage(tenant_id, reviews=stats['total'])
         
-        results = {
-            # Basic statistics
-            'total_reviews': total,
-            'sentiment_counts': sentiment_counts,
-            'sentiment_percentages': sentiment_percentages,
-            
-            # Chart data
-            'chart_data': chart_data,
-            'word_freq_data': word_freq_data,
-            
-            # Keywords
-            'keywords': keywords,
-            
-            # Summary
-            'summary': summary,
-            'recommendation': recommendation,
-            
-            # Samples
-            'samples': samples,
-            'has_rating': has_rating,
-            
+        results.update({
             # Metadata
             'upload_date': datetime.now().strftime("%d-%m-%Y %H:%M:%S"),
             'model_used': 'Menggunakan Naive Bayes',
-            'accuracy_info': accuracy_info,
             
             # File info
             'filename': file.filename,
-            'file_size': len(df)
-        }
+            'file_size': stats['total']
+        })
         
+        completed = True
         return jsonify(results)
         
+    except TenantError as e:
+        return jsonify({'error': str(e)}), e.status
+    except QueueTimeout:
+        record_tenant_usage(tenant_id, rejected=True)
+        return jsonify({'error': 'Antrian analisis sedang penuh. Coba lagi nanti'}), 503
     except pd.errors.EmptyDataError:
         return jsonify({'error': 'File CSV kosong atau format tidak valid'}), 400
     except UnicodeDecodeError:
@@ -547,12 +1391,17 @@ def upload_file():
         print(f"❌ Error in upload_file: {str(e)}")
         print(traceback.format_exc())
         return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+    finally:
+        if ticket is not None:
+            analysis_scheduler.release(ticket)
+        if charged_rows and not completed:
+            refund_row_tokens(tenant_id, charged_rows)
 
 @app.route('/history')
 def get_history():
     """Endpoint untuk mengambil riwayat upload"""
     try:
-        history = get_upload_history()
+        history = get_upload_history(get_tenant_id())
         history_list = []
         
         for item in history:
@@ -575,26 +1424,160 @@ def get_history():
             history_list.append(history_dict)
         
         return jsonify({'history': history_list})
+    except TenantError as e:
+        return jsonify({'error': str(e)}), e.status
     except Exception as e:
         print(f"⚠️  Error in get_history endpoint: {e}")
         return jsonify({'history': []})
 
 @app.route('/clear_history', methods=['POST'])
 def clear_history():
-    """Endpoint untuk menghapus riwayat"""
+    """Endpoint untuk menghapus riwayat milik tenant yang sedang request"""
     try:
+        tenant_id = get_tenant_id()
+        ensure_db()
         conn = sqlite3.connect('database.db')
         cursor = conn.cursor()
-        cursor.execute('DELETE FROM upload_history')
+        cursor.execute('DELETE FROM upload_history WHERE tenant_id = ?', (tenant_id,))
+        delete_indexed_reviews(cursor, tenant_id)
         conn.commit()
         conn.close()
         return jsonify({'success': True, 'message': 'Riwayat berhasil dihapus'})
+    except TenantError as e:
+        return jsonify({'error': str(e)}), e.status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/search')
+def search():
+    """Cari ulasan dari semua upload tenant berdasarkan kata, sentimen, dan tanggal.
+    
+    Parameter: q (kata kunci), match (any/all), sentiment, date_from dan
+    date_to (YYYY-MM-DD), page, per_page.
+    """
+    started = time.perf_counter()
+    
+    try:
+        tenant_id = get_tenant_id()
+    except TenantError as e:
+        return jsonify({'error': str(e)}), e.status
+    
+    terms = request.args.get('q', '').strip()
+    match_all = request.args.get('match', 'any') == 'all'
+    sentiment = request.args.get('sentiment')
+    date_from = request.args.get('date_from')
+    date_to = request.args.get('date_to')
+    
+    if sentiment and sentiment not in SENTIMENT_LABELS:
+        return jsonify({'error': 'Sentimen harus positif, negatif, atau netral'}), 400
+    
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 20)), 1), SEARCH_MAX_PER_PAGE)
+        if date_from:
+            date_from = str(datetime.strptime(date_from, '%Y-%m-%d'))
+        if date_to:
+            # Inklusif sampai akhir hari date_to
+            date_to = str(datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        return jsonify({'error': 'Parameter page/per_page harus angka dan tanggal berformat YYYY-MM-DD'}), 400
+    
+    # Semua filter (tenant, kata kunci, sentimen) digabung dalam satu query FTS
+    match_parts = [f'tags : "{_tenant_tag(tenant_id)}"']
+    if terms:
+        term_query = build_fts_query(terms, match_all)
+        if not term_query:
+            return jsonify({'error': 'Kata kunci pencarian tidak valid'}), 400
+        match_parts.append(f'review : ({term_query})')
+    if sentiment:
+        match_parts.append(f'tags : "{_sentiment_tag(sentiment)}"')
+    
+    conditions = ['review_fts MATCH ?']
+    params = [' AND '.join(match_parts)]
+    
+    try:
+        ensure_db()
+        conn = sqlite3.connect('database.db')
+        cursor = conn.cursor()
+        
+        # Filter tanggal -> rentang rowid, karena rowid dialokasikan berurutan per upload
+        if date_from or date_to:
+            batch_conditions = ['tenant_id = ?']
+            batch_params = [tenant_id]
+            if date_from:
+                batch_conditions.append('upload_date >= ?')
+                batch_params.append(date_from)
+            if date_to:
+                batch_conditions.append('upload_date < ?')
+                batch_params.append(date_to)
+            first_id, last_id = cursor.execute(f'''
+                SELECT MIN(first_id), MAX(last_id)
+                FROM review_index_batches
+                WHERE {' AND '.join(batch_conditions)}
+            ''', batch_params).fetchone()
+            conditions.append('review_fts.rowid BETWEEN ? AND ?')
+            params.extend([first_id or 0, last_id or -1])
+        
+        where = ' AND '.join(conditions)
+        
+        total = cursor.execute(f'SELECT COUNT(*) FROM review_fts WHERE {where}', params).fetchone()[0]
+        rows = cursor.execute(f'''
+            SELECT review_fts.rowid, review_fts.review, review_fts.sentiment,
+                   review_fts.history_id, h.filename, h.upload_date
+            FROM review_fts
+            LEFT JOIN upload_history h ON h.id = review_fts.history_id
+            WHERE {where}
+            ORDER BY review_fts.rowid DESC
+            LIMIT ? OFFSET ?
+        ''', params + [per_page, (page - 1) * per_page]).fetchall()
+        indexed_reviews = get_indexed_review_count(cursor, tenant_id)
+        
+        conn.close()
+    except sqlite3.OperationalError as e:
+        print(f"⚠️  Error in search endpoint: {e}")
+        return jsonify({'error': 'Query pencarian tidak valid'}), 400
+    
+    return jsonify({
+        'results': [{
+            'id': row[0],
+            'review': row[1],
+            'sentiment': row[2],
+            'history_id': row[3],
+            'filename': row[4],
+            'upload_date': row[5]
+        } for row in rows],
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page,
+        'index': {'indexed_reviews': indexed_reviews},
+        'took_ms': round((time.perf_counter() - started) * 1000, 2)
+    })
+
+@app.route('/usage')
+def usage():
+    """Endpoint counter pemakaian dan status antrian analisis tenant"""
+    try:
+        tenant_id = get_tenant_id()
+    except TenantError as e:
+        return jsonify({'error': str(e)}), e.status
+    
+    queue = analysis_scheduler.snapshot()
+    
+    return jsonify({
+        'usage': get_tenant_usage(tenant_id),
+        'queue': {
+            'running': queue['running'].get(tenant_id, 0),
+            'waiting': queue['waiting'].get(tenant_id, 0),
+            'free_slots': queue['free_slots'],
+            'total_slots': queue['total_slots']
+        }
+    })
+
 @app.route('/reset_db', methods=['POST'])
 def reset_db():
     """Endpoint untuk reset database (development only)"""
+    global _db_ready
     try:
         # Hapus file database
         if os.path.exists('database.db'):
@@ -602,7 +1585,8 @@ def reset_db():
             print("🗑️  Database file deleted")
         
         # Inisialisasi ulang
-        init_db()
+        _db_ready = False
+        ensure_db()
         
         return jsonify({'success': True, 'message': 'Database berhasil direset'})
     except Exception as e:
@@ -618,10 +1602,13 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'database': os.path.exists('database.db'),
-        'model': 'Naive Bayes initialized',
+        'model': 'Naive Bayes initialized' if _model is not None else 'Naive Bayes (lazy, belum dilatih)',
+        'startup': _startup_timings,
+        'search_index_bytes': get_search_index_size(),
         'timestamp': datetime.now().isoformat()
     })
 
 if __name__ == '__main__':
     print("🚀 UlasPintar - Starting Flask Application")
+    mark_ready()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,185 @@
+# dedup.py
+# Deteksi ulasan duplikat / hampir sama (copy-paste, template) dengan MinHash + LSH
+import zlib
+
+import numpy as np
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = (1 << 32) - 1
+
+class MinHashLSH:
+    """Cluster ulasan yang hampir sama tanpa membandingkan semua pasangan.
+    
+    Tiap ulasan diubah menjadi himpunan shingle (pasangan kata berurutan),
+    lalu diringkas menjadi signature MinHash `num_perm` nilai. Signature
+    dipotong menjadi `bands` bagian; ulasan dengan satu bagian yang sama
+    menjadi kandidat, dan kandidat baru digabung jika estimasi kemiripan
+    Jaccard-nya >= `threshold`. Waktu proses kira-kira linear terhadap
+    jumlah ulasan.
+    
+    Ulasan dengan kurang dari `min_tokens` kata tidak di-fingerprint:
+    ulasan pendek seperti "bagus" wajar muncul berkali-kali dan bukan spam.
+    Token di `ignore_tokens` (misalnya penanda tanda baca) tidak dihitung
+    sebagai kata.
+    """
+    
+    def __init__(self, num_perm=32, bands=8, threshold=0.8, min_tokens=5, seed=42,
+                 ignore_tokens=()):
+        if num_perm % bands != 0:
+            raise ValueError('num_perm harus habis dibagi bands')
+        
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.min_tokens = min_tokens
+        self.ignore_tokens = frozenset(ignore_tokens)
+        
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, MAX_HASH, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, MAX_HASH, size=num_perm, dtype=np.int64).astype(np.uint64)
+        # Pengali untuk meringkas satu band menjadi satu key (overflow uint64 disengaja)
+        self._band_mix = (rng.randint(1, MAX_HASH, size=self.rows, dtype=np.int64) | 1).astype(np.uint64)
+    
+    def _tokens(self, text):
+        tokens = text.split()
+        if self.ignore_tokens:
+            tokens = [token for token in tokens if token not in self.ignore_tokens]
+        return tokens
+    
+    def _shingle_hashes(self, texts, token_hashes):
+        """Hash shingle (pasangan kata berurutan) dan offset awal tiap ulasan.
+        
+        Hash kata dihitung sekali per kata unik (cache `token_hashes`),
+        hash pasangan kata digabung dengan numpy.
+        """
+        token_lists = [self._tokens(text) for text in texts]
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+        
+        def hash_token(token):
+            value = token_hashes.get(token)
+            if value is None:
+                value = token_hashes[token] = zlib.crc32(token.encode('utf-8'))
+            return value
+        
+        flat = np.fromiter((hash_token(token) for tokens in token_lists for token in tokens),
+                           dtype=np.uint64, count=int(lengths.sum()))
+        del token_lists
+        starts = np.cumsum(lengths) - lengths
+        
+        pairs = (flat[:-1] * np.uint64(0x9E3779B1) + flat[1:]) & np.uint64(MAX_HASH)
+        # Buang pasangan yang melewati batas dua ulasan
+        keep = np.ones(len(pairs), dtype=bool)
+        keep[starts[1:] - 1] = False
+        
+        return pairs[keep], starts - np.arange(len(lengths))
+    
+    def signatures(self, texts, batch_size=50000):
+        """Signature MinHash (uint32) untuk setiap teks (minimal 2 kata).
+        
+        Teks dipecah menjadi kata per batch, sehingga token seluruh upload
+        tidak pernah disimpan sekaligus.
+        """
+        signatures = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        token_hashes = {}
+        
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            hashes, offsets = self._shingle_hashes(batch, token_hashes)
+            
+            # Satu permutasi per iterasi, nilai minimum per ulasan lewat reduceat
+            for k in range(self.num_perm):
+                permuted = (self._a[k] * hashes + self._b[k]) % MERSENNE_PRIME
+                signatures[start:start + len(batch), k] = np.minimum.reduceat(permuted, offsets) & MAX_HASH
+        
+        return signatures
+    
+    def _candidate_pairs(self, signatures):
+        """Pasangan (a, b) dari bucket LSH yang lolos verifikasi kemiripan"""
+        n = len(signatures)
+        positions = np.arange(n)
+        left, right = [], []
+        
+        for band in range(self.bands):
+            rows = signatures[:, band * self.rows:(band + 1) * self.rows].astype(np.uint64)
+            keys = (rows * self._band_mix).sum(axis=1)
+            
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            is_start = np.ones(n, dtype=bool)
+            is_start[1:] = sorted_keys[1:] != sorted_keys[:-1]
+            
+            # Bandingkan setiap anggota bucket dengan anggota pertamanya
+            first = order[np.maximum.accumulate(np.where(is_start, positions, 0))]
+            members = ~is_start
+            a, b = first[members], order[members]
+            
+            similarity = (signatures[a] == signatures[b]).mean(axis=1)
+            keep = similarity >= self.threshold
+            left.append(a[keep])
+            right.append(b[keep])
+        
+        return np.concatenate(left), np.concatenate(right)
+    
+    def cluster(self, texts):
+        """Return array representative: posisi ulasan pertama di cluster tiap ulasan.
+        
+        Ulasan unik (atau terlalu pendek) menjadi representative dirinya sendiri.
+        """
+        representative = np.arange(len(texts))
+        
+        # Hanya jumlah kata per ulasan yang disimpan, bukan tokennya
+        token_counts = np.fromiter((len(self._tokens(text)) for text in texts),
+                                   dtype=np.int64, count=len(texts))
+        eligible = np.flatnonzero(token_counts >= self.min_tokens)
+        del token_counts
+        if len(eligible) < 2:
+            return representative
+        
+        signatures = self.signatures([texts[i] for i in eligible.tolist()])
+        left, right = self._candidate_pairs(signatures)
+        
+        # Union-find atas pasangan kandidat
+        parent = list(range(len(eligible)))
+        
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+        
+        for a, b in zip(left.tolist(), right.tolist()):
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                # Root terkecil = ulasan yang muncul paling awal
+                if root_a < root_b:
+                    parent[root_b] = root_a
+                else:
+                    parent[root_a] = root_b
+        
+        roots = np.array([find(i) for i in range(len(eligible))], dtype=np.int64)
+        representative[eligible] = eligible[roots]
+        return representative
+
+def summarize_clusters(representative, texts, top_n=5):
+    """Ringkasan cluster duplikat untuk ditampilkan di hasil analisis"""
+    representative = np.asarray(representative)
+    is_duplicate = ~unique_mask(representative)
+    
+    sizes = np.bincount(representative[is_duplicate], minlength=len(representative))
+    cluster_ids = np.flatnonzero(sizes)
+    largest = cluster_ids[np.argsort(-sizes[cluster_ids], kind='stable')][:top_n]
+    
+    return {
+        'duplicate_reviews': int(is_duplicate.sum()),
+        'clusters': int(len(cluster_ids)),
+        'top_clusters': [
+            {'size': int(sizes[i]) + 1, 'review': texts[i]}
+            for i in largest
+        ]
+    }
+
+def unique_mask(representative):
+    """Mask ulasan yang menjadi representative cluster (bukan duplikat)"""
+    representative = np.asarray(representative)
+    return representative == np.arange(len(representative))
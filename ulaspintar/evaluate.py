@@ -0,0 +1,419 @@
+# evaluate.py
+# Evaluasi model sentimen dengan k-fold cross-validation terhadap rating ulasan.
+#
+# Dipakai untuk mengukur dampak perubahan POSITIVE_WORDS/NEGATIVE_WORDS di
+# app.py atau logika train_model.py terhadap akurasi DAN kecepatan sekaligus:
+#
+#   python evaluate.py --save baseline.json        # sebelum perubahan
+#   python evaluate.py --baseline baseline.json    # sesudah perubahan
+#
+# Label kebenaran diambil dari rating (ratings_to_sentiment_codes), prediksi hanya
+# dari teks. Berbeda dengan estimated_accuracy di upload_file yang memakai
+# sentimen gabungan teks + rating.
+import argparse
+import glob
+import hashlib
+import inspect
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import pandas as pd
+
+from app import (
+    SimpleNaiveBayes, POSITIVE_WORDS, NEGATIVE_WORDS, NEUTRAL_WORDS,
+    ASPECT_LOOKUP, ASPECT_BREAK_WORDS, SENTIMENT_LABELS, SENTIMENT_CODES,
+    clean_text, is_missing, ratings_to_sentiment_codes, summarize_aspects
+)
+from train_model import get_common_words, categorize_words
+from train_model import clean_text as train_clean_text
+
+# CSV dan cache selalu dicari di folder ini (bukan working directory)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, '.eval_cache')
+# Naikkan jika format file cache berubah
+CACHE_VERSION = 3
+
+# Semua fungsi yang menentukan isi cache fold (teks bersih dan label),
+# termasuk fungsi yang dipanggil di dalamnya. Kode sumbernya ikut di-hash.
+PREPROCESSING_FUNCTIONS = (clean_text, is_missing, ratings_to_sentiment_codes, train_clean_text)
+
+def build_lexicon_model(word_counts):
+    """Model yang dipakai app.py (lexicon tetap, tidak memakai fold training)"""
+    nb = SimpleNaiveBayes()
+    nb.train(POSITIVE_WORDS, NEGATIVE_WORDS, NEUTRAL_WORDS)
+    return nb
+
+def build_trained_model(word_counts):
+    """Model dari logika train_model.py, dilatih ulang dari fold training.
+    
+    `word_counts` dihitung dari teks hasil train_model.clean_text, sama
+    seperti saat train_model.py dijalankan.
+    """
+    word_freq = Counter()
+    for counts in word_counts:
+        word_freq.update(counts)
+
+    positive_words, negative_words, neutral_words = categorize_words(get_common_words(word_freq))
+    nb = SimpleNaiveBayes()
+    nb.train(positive_words, negative_words, neutral_words)
+    return nb
+
+MODELS = {
+    'lexicon': build_lexicon_model,
+    'trained': build_trained_model,
+}
+
+def find_rated_csvs():
+    """File CSV di folder ini yang memiliki kolom review dan rating"""
+    files = []
+    for csv_file in sorted(glob.glob(os.path.join(BASE_DIR, '*.csv'))):
+        try:
+            columns = pd.read_csv(csv_file, nrows=0).columns
+        except Exception as e:
+            print(f"  ✗ Error membaca {csv_file}: {e}")
+            continue
+        if 'review' in columns and 'rating' in columns:
+            files.append(csv_file)
+    return files
+
+def load_reviews(files):
+    """Baca dan bersihkan ulasan.
+    
+    Return (teks untuk scoring, teks untuk training, kode sentimen dari
+    rating, ulasan mentah). Teks scoring dibersihkan dengan clean_text
+    app.py (seperti upload_file), teks training dengan clean_text
+    train_model.py. Ulasan mentah (termasuk yang kosong setelah dibersihkan)
+    dipakai untuk mengukur kecepatan.
+    """
+    texts = []
+    train_texts = []
+    labels = []
+    raw_reviews = []
+
+    for csv_file in files:
+        df = pd.read_csv(csv_file, usecols=['review', 'rating'])
+        df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
+        # Ulasan tanpa rating tidak punya label kebenaran
+        df = df[df['rating'].notna()]
+
+        codes = ratings_to_sentiment_codes(df['rating'].to_numpy(dtype=float))
+        raw_reviews.extend(df['review'].tolist())
+        
+        for review, code in zip(df['review'], codes.tolist()):
+            cleaned = clean_text(review)
+            if cleaned:
+                texts.append(cleaned)
+                train_texts.append(train_clean_text(review))
+                labels.append(code)
+
+        print(f"  ✓ {os.path.basename(csv_file)}: {len(df)} ulasan berating")
+
+    return texts, train_texts, labels, raw_reviews
+
+def make_folds(labels, k, seed):
+    """Bagi indeks ulasan ke k fold dengan proporsi sentimen yang sama (stratified)"""
+    rng = random.Random(seed)
+    by_label = {}
+    for i, label in enumerate(labels):
+        by_label.setdefault(label, []).append(i)
+
+    folds = [[] for _ in range(k)]
+    offset = 0
+    for label in sorted(by_label):
+        indices = by_label[label]
+        rng.shuffle(indices)
+        for j, i in enumerate(indices):
+            folds[(offset + j) % k].append(i)
+        offset += len(indices)
+
+    return [sorted(fold) for fold in folds]
+
+def get_cache_key(files, k, seed):
+    """Hash isi CSV, parameter fold, dan kode PREPROCESSING_FUNCTIONS.
+
+    Perubahan data atau preprocessing otomatis membuat cache baru,
+    perubahan lexicon/model tidak (itu yang ingin dievaluasi ulang).
+    """
+    digest = hashlib.sha1()
+    digest.update(f'{CACHE_VERSION}:{k}:{seed}'.encode())
+    for function in PREPROCESSING_FUNCTIONS:
+        digest.update(inspect.getsource(function).encode())
+    for csv_file in files:
+        digest.update(csv_file.encode())
+        with open(csv_file, 'rb') as f:
+            digest.update(hashlib.sha1(f.read()).digest())
+    return digest.hexdigest()[:16]
+
+def prepare_folds(files, k, seed, use_cache=True):
+    """Siapkan fold di disk, return folder cache berisi meta.pkl dan fold-<i>.pkl"""
+    cache_path = os.path.join(CACHE_DIR, get_cache_key(files, k, seed))
+    meta_file = os.path.join(cache_path, 'meta.pkl')
+
+    if use_cache and os.path.exists(meta_file):
+        print(f"♻️  Memakai cache fold: {cache_path}")
+        return cache_path
+
+    started = time.perf_counter()
+    print("🧹 Membersihkan teks...")
+    texts, train_texts, labels, raw_reviews = load_reviews(files)
+    if len(texts) < k:
+        raise ValueError(f'Jumlah ulasan ({len(texts)}) lebih sedikit dari jumlah fold ({k})')
+
+    os.makedirs(cache_path, exist_ok=True)
+    folds = make_folds(labels, k, seed)
+    word_counts = []
+    for fold, indices in enumerate(folds):
+        joblib.dump({
+            'texts': [texts[i] for i in indices],
+            'labels': [labels[i] for i in indices]
+        }, os.path.join(cache_path, f'fold-{fold}.pkl'))
+        word_counts.append(Counter(' '.join(train_texts[i] for i in indices).split()))
+
+    # meta.pkl ditulis terakhir sebagai penanda cache lengkap
+    joblib.dump({
+        'files': files,
+        'fold_sizes': [len(indices) for indices in folds],
+        'word_counts': word_counts,
+        'raw_reviews': raw_reviews
+    }, meta_file)
+
+    print(f"💾 {len(texts)} ulasan dibagi ke {k} fold dalam {time.perf_counter() - started:.2f} s, disimpan ke cache")
+    return cache_path
+
+def evaluate_fold(cache_path, model_name, fold):
+    """Latih model dari fold lain, lalu nilai akurasi satu fold"""
+    meta = joblib.load(os.path.join(cache_path, 'meta.pkl'))
+    train_counts = [counts for i, counts in enumerate(meta['word_counts']) if i != fold]
+    model = MODELS[model_name](train_counts)
+
+    data = joblib.load(os.path.join(cache_path, f'fold-{fold}.pkl'))
+    texts = data['texts']
+
+    predictions = [
+        model.predict_with_aspects(text.split(), ASPECT_LOOKUP, ASPECT_BREAK_WORDS)[0]
+        for text in texts
+    ]
+
+    # Baris = sentimen dari rating, kolom = sentimen prediksi
+    matrix = [[0] * len(SENTIMENT_LABELS) for _ in SENTIMENT_LABELS]
+    for actual, predicted in zip(data['labels'], predictions):
+        matrix[actual][SENTIMENT_CODES[predicted]] += 1
+
+    return {
+        'model': model_name,
+        'fold': fold,
+        'reviews': len(texts),
+        'matrix': matrix
+    }
+
+def analyze_corpus(model, reviews):
+    """Jalur yang sama dengan analyze_reviews di upload_file: clean_text, lalu
+    sentimen dan aspek per ulasan, lalu summarize_aspects"""
+    cleaned = [clean_text(review) for review in reviews]
+    summarize_aspects(
+        model.predict_with_aspects(text.split(), ASPECT_LOOKUP, ASPECT_BREAK_WORDS)[1]
+        for text in cleaned if text
+    )
+
+def measure_speed(cache_path, model_name, min_time=1.0, rounds=10):
+    """Ukur ulasan/detik untuk seluruh korpus mentah, return ronde tercepat.
+
+    Dijalankan berurutan di proses utama, terpisah dari penilaian akurasi
+    yang paralel, agar proses lain tidak ikut terukur. Satu ronde mengulang
+    korpus sampai minimal `min_time` detik, karena korpus kecil selesai dalam
+    beberapa milidetik dan terlalu dipengaruhi noise timer/scheduler.
+    Ronde tercepat paling sedikit terganggu proses lain di mesin.
+    """
+    meta = joblib.load(os.path.join(cache_path, 'meta.pkl'))
+    # Model dilatih dari semua fold, seperti model yang dipakai app.py
+    model = MODELS[model_name](meta['word_counts'])
+    reviews = meta['raw_reviews']
+
+    # Pemanasan (import, cache regex) tidak ikut diukur
+    analyze_corpus(model, reviews)
+
+    best = 0
+    for _ in range(rounds):
+        passes = 0
+        started = time.perf_counter()
+        while True:
+            analyze_corpus(model, reviews)
+            passes += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                break
+        best = max(best, passes * len(reviews) / elapsed)
+
+    return best
+
+def summarize(results, speeds):
+    """Gabungkan hasil per fold dan kecepatan (measure_speed) menjadi laporan per model"""
+    report = {}
+
+    for model_name in dict.fromkeys(result['model'] for result in results):
+        model_results = [result for result in results if result['model'] == model_name]
+
+        size = len(SENTIMENT_LABELS)
+        matrix = [[sum(result['matrix'][a][p] for result in model_results) for p in range(size)]
+                  for a in range(size)]
+        total = sum(map(sum, matrix))
+        correct = sum(matrix[i][i] for i in range(size))
+
+        fold_accuracies = [
+            sum(result['matrix'][i][i] for i in range(size)) / result['reviews'] * 100
+            for result in model_results if result['reviews']
+        ]
+        mean = sum(fold_accuracies) / len(fold_accuracies)
+        std = math.sqrt(sum((acc - mean) ** 2 for acc in fold_accuracies) / len(fold_accuracies))
+
+        per_class = {}
+        for i, label in enumerate(SENTIMENT_LABELS):
+            predicted = sum(matrix[a][i] for a in range(size))
+            actual = sum(matrix[i])
+            per_class[label] = {
+                'precision': round(matrix[i][i] / predicted * 100, 2) if predicted else 0,
+                'recall': round(matrix[i][i] / actual * 100, 2) if actual else 0,
+                'support': actual
+            }
+
+        report[model_name] = {
+            'accuracy': round(correct / total * 100, 2) if total else 0,
+            'accuracy_std': round(std, 2),
+            'reviews_per_sec': round(speeds[model_name], 1),
+            'reviews': total,
+            'confusion_matrix': matrix,
+            'per_class': per_class
+        }
+
+    return report
+
+def print_report(report, k):
+    """Tampilkan akurasi dan kecepatan berdampingan, lalu confusion matrix"""
+    print(f"\n📊 Hasil {k}-fold cross-validation:")
+    print(f"   {'Model':<10} {'Akurasi':>16} {'Ulasan/detik':>14}")
+    for model_name, result in report.items():
+        accuracy = f"{result['accuracy']:.2f}% ± {result['accuracy_std']:.2f}"
+        print(f"   {model_name:<10} {accuracy:>16} {result['reviews_per_sec']:>14,.0f}")
+
+    for model_name, result in report.items():
+        print(f"\n🔢 Confusion matrix '{model_name}' (baris = rating, kolom = prediksi):")
+        print(f"   {'':<9}" + ''.join(f"{label:>9}" for label in SENTIMENT_LABELS)
+              + f"{'recall':>10}")
+        for i, label in enumerate(SENTIMENT_LABELS):
+            row = ''.join(f"{count:>9}" for count in result['confusion_matrix'][i])
+            print(f"   {label:<9}{row}{result['per_class'][label]['recall']:>9.1f}%")
+        print(f"   {'precision':<9}" + ''.join(
+            f"{result['per_class'][label]['precision']:>8.1f}%" for label in SENTIMENT_LABELS))
+
+def compare_with_baseline(report, baseline, max_slowdown):
+    """Bandingkan dengan laporan sebelumnya. Return False jika ada model yang melambat
+    lebih dari `max_slowdown` (persen)"""
+    ok = True
+    print("\n📈 Dibandingkan dengan baseline:")
+
+    for model_name, result in report.items():
+        if model_name not in baseline:
+            continue
+        before = baseline[model_name]
+        accuracy_delta = result['accuracy'] - before['accuracy']
+        speed_delta = ((result['reviews_per_sec'] / before['reviews_per_sec'] - 1) * 100
+                       if before['reviews_per_sec'] else 0)
+
+        status = '✓'
+        if -speed_delta > max_slowdown:
+            status = '⚠️ '
+            ok = False
+        print(f"   {status} {model_name:<10} akurasi {accuracy_delta:+.2f} poin, "
+              f"kecepatan {speed_delta:+.1f}%")
+
+    if not ok:
+        print(f"\n⚠️  Kecepatan turun lebih dari {max_slowdown:.0f}% dibanding baseline!")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluasi model sentimen UlasPintar dengan k-fold cross-validation')
+    parser.add_argument('--folds', type=int, default=5, help='jumlah fold (default 5)')
+    parser.add_argument('--seed', type=int, default=42, help='seed pembagian fold')
+    parser.add_argument('--models', default=','.join(MODELS), help='model yang dievaluasi, dipisah koma')
+    parser.add_argument('--jobs', type=int, default=None, help='jumlah proses paralel (default: jumlah CPU)')
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help='durasi minimal satu ronde pengukuran kecepatan dalam detik (default 1)')
+    parser.add_argument('--rounds', type=int, default=10,
+                        help='jumlah ronde pengukuran kecepatan, diambil yang tercepat (default 10)')
+    parser.add_argument('--files', nargs='*', help='file CSV (default: semua CSV berating di folder ini)')
+    parser.add_argument('--no-cache', action='store_true', help='selalu preprocessing ulang')
+    parser.add_argument('--save', help='simpan laporan ke file JSON')
+    parser.add_argument('--baseline', help='bandingkan dengan laporan JSON sebelumnya')
+    # Di mesin bersama, 10 ronde masih bisa berbeda sampai ~9% antar run
+    parser.add_argument('--max-slowdown', type=float, default=15,
+                        help='exit code 1 jika kecepatan turun lebih dari persen ini dibanding baseline (default 15)')
+    args = parser.parse_args()
+
+    model_names = [name.strip() for name in args.models.split(',') if name.strip()]
+    unknown = [name for name in model_names if name not in MODELS]
+    if unknown:
+        parser.error(f"model tidak dikenal: {', '.join(unknown)} (pilihan: {', '.join(MODELS)})")
+    if args.folds < 2:
+        parser.error('--folds minimal 2')
+    if args.min_time < 1:
+        parser.error('--min-time minimal 1 detik')
+    if args.rounds < 1:
+        parser.error('--rounds minimal 1')
+
+    files = args.files or find_rated_csvs()
+    if not files:
+        print("❌ Tidak ada file CSV dengan kolom review dan rating ditemukan!")
+        return 1
+
+    print(f"🔍 {len(files)} file CSV: {', '.join(map(os.path.basename, files))}")
+    cache_path = prepare_folds(files, args.folds, args.seed, use_cache=not args.no_cache)
+
+    tasks = [(cache_path, model_name, fold)
+             for model_name in model_names for fold in range(args.folds)]
+    jobs = args.jobs or min(len(tasks), os.cpu_count() or 1)
+
+    started = time.perf_counter()
+    print(f"⚙️  Menilai {len(tasks)} fold dengan {jobs} proses...")
+    if jobs == 1:
+        results = [evaluate_fold(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(evaluate_fold, *zip(*tasks)))
+    print(f"⏱️  Selesai dalam {time.perf_counter() - started:.2f} s")
+
+    # Setelah pool ditutup, agar pengukuran tidak berebut CPU
+    print(f"🏎️  Mengukur kecepatan ({args.rounds} ronde x minimal {args.min_time:g} s per model)...")
+    speeds = {model_name: measure_speed(cache_path, model_name, args.min_time, args.rounds)
+              for model_name in model_names}
+
+    report = summarize(results, speeds)
+    print_report(report, args.folds)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['models']
+        if not compare_with_baseline(report, baseline, args.max_slowdown):
+            exit_code = 1
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({
+                'folds': args.folds,
+                'seed': args.seed,
+                'files': files,
+                'date': pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'models': report
+            }, f, indent=2)
+        print(f"\n✅ Laporan disimpan ke '{args.save}'")
+
+    return exit_code
+
+if __name__ == '__main__':
+    raise SystemExit(main())
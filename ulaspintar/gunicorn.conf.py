@@ -0,0 +1,49 @@
+# gunicorn.conf.py
+# Jalankan dengan: gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Satu worker: antrian fair-share dan batas concurrency per tenant (lihat
+# tenancy.py) ada di memori worker, jadi setiap worker tambahan
+# melipatgandakan batas tersebut. CPU lain dipakai oleh process pool
+# analisis (ULASPINTAR_ANALYSIS_SLOTS proses), bukan oleh worker tambahan.
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+
+# Worker thread agar upload besar bisa menunggu antrian/process pool
+# sementara request kecil tetap dilayani. Jaga agar
+# threads > ULASPINTAR_ANALYSIS_SLOTS.
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Recycle worker mereset antrian tenant dan process pool, jadi default-nya
+# dimatikan. Dengan preload_app worker baru tidak perlu mengulang import
+# dan training model karena state sudah ada di master.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = 50
+
+# Muat app.py sekali di master, lalu fork worker (copy-on-write)
+preload_app = True
+
+def on_starting(server):
+    """Siapkan database, model, dan pandas di master sebelum fork worker"""
+    import app
+    app.warmup()
+
+def post_fork(server, worker):
+    """Mulai ulang hitungan startup di worker hasil fork"""
+    import sys
+    import time
+    import app
+    app._PROCESS_STARTED = time.perf_counter()
+    
+    # Thread request kecil lebih cepat mendapat GIL kembali dari thread yang
+    # membaca CSV atau mengindeks upload besar (default Python 5 ms)
+    sys.setswitchinterval(float(os.environ.get('GUNICORN_SWITCH_INTERVAL', 0.001)))
+
+def post_worker_init(worker):
+    """Worker siap menerima request: catat waktu fork -> siap"""
+    import app
+    app.mark_ready()
+    # Proses analisis dijalankan di background, tidak ditunggu
+    app.start_analysis_pool()
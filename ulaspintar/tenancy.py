@@ -0,0 +1,96 @@
+# tenancy.py
+# Penjadwalan analisis per tenant: antrian fair-share
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+
+class QueueTimeout(Exception):
+    """Slot analisis tidak tersedia dalam batas waktu tunggu"""
+
+class TenantScheduler:
+    """Antrian fair-share untuk pekerjaan analisis yang berat.
+    
+    Maksimal `total_slots` analisis berjalan bersamaan dalam satu proses,
+    dan satu tenant maksimal memakai `per_tenant_limit` slot. Slot yang
+    kosong diberikan bergiliran (round-robin) ke tenant yang sedang
+    menunggu, sehingga upload besar dari satu tenant tidak menahan antrian
+    tenant lain.
+    
+    State antrian ada di memori proses, jadi batas ini hanya berlaku
+    menyeluruh jika semua request dilayani satu proses.
+    """
+    
+    def __init__(self, total_slots=2, per_tenant_limit=1):
+        self.total_slots = total_slots
+        self.per_tenant_limit = per_tenant_limit
+        self._cond = threading.Condition()
+        self._running = Counter()
+        # tenant -> deque tiket yang menunggu; urutan dict = giliran
+        self._waiting = OrderedDict()
+        self._free = total_slots
+    
+    def _next_ticket(self):
+        """Tiket berikutnya yang berhak mendapat slot (atau None)"""
+        if self._free <= 0:
+            return None
+        for tenant, queue in self._waiting.items():
+            if queue and self._running[tenant] < self.per_tenant_limit:
+                return queue[0]
+        return None
+    
+    def acquire(self, tenant, timeout=None):
+        """Tunggu slot untuk tenant. Raise QueueTimeout jika melewati timeout"""
+        ticket = (tenant, object())
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        with self._cond:
+            self._waiting.setdefault(tenant, deque()).append(ticket)
+            
+            while self._next_ticket() is not ticket:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._remove(ticket)
+                    # Tiket lain mungkin jadi berhak setelah tiket ini keluar
+                    self._cond.notify_all()
+                    raise QueueTimeout(f"Tidak mendapat giliran analisis dalam {timeout} detik")
+                self._cond.wait(remaining)
+            
+            self._remove(ticket)
+            self._running[tenant] += 1
+            self._free -= 1
+            
+            # Tenant yang baru dilayani pindah ke akhir giliran
+            if tenant in self._waiting:
+                self._waiting.move_to_end(tenant)
+            
+            self._cond.notify_all()
+        
+        return ticket
+    
+    def release(self, ticket):
+        tenant = ticket[0]
+        with self._cond:
+            self._running[tenant] -= 1
+            if self._running[tenant] <= 0:
+                del self._running[tenant]
+            self._free += 1
+            self._cond.notify_all()
+    
+    def _remove(self, ticket):
+        tenant = ticket[0]
+        queue = self._waiting.get(tenant)
+        if queue is None:
+            return
+        queue.remove(ticket)
+        if not queue:
+            del self._waiting[tenant]
+    
+    def snapshot(self):
+        """Status antrian saat ini untuk monitoring"""
+        with self._cond:
+            return {
+                'total_slots': self.total_slots,
+                'free_slots': self._free,
+                'running': dict(self._running),
+                'waiting': {tenant: len(queue) for tenant, queue in self._waiting.items()}
+            }
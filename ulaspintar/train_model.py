@@ -5,6 +5,27 @@ from collections import Counter
 import joblib
 import os
 
+# Kata kunci untuk mengkategorikan kata hasil training
+POSITIVE_KEYWORDS = [
+    'bagus', 'baik', 'suka', 'puas', 'mantap', 'recommended',
+    'cepat', 'murah', 'berkualitas', 'sempurna', 'original',
+    'memuaskan', 'top', 'terbaik', 'ramah', 'aman', 'rapih',
+    'senang', 'hebat', 'luar', 'biasa', 'wow', 'keren', 'cocok',
+    'pas', 'sesuai', 'lengkap', 'enak', 'nyaman', 'lembut',
+    'halus', 'tepat', 'amanah', 'sukses', 'salut', 'jempol',
+    'gemess', 'lucu', 'cantik', 'imut', 'gemes', 'recommended'
+]
+
+NEGATIVE_KEYWORDS = [
+    'buruk', 'jelek', 'kecewa', 'lambat', 'mahal', 'rusak',
+    'cacat', 'mengecewakan', 'palsu', 'gagal', 'error',
+    'bermasalah', 'reject', 'komplain', 'salah', 'tipis',
+    'kecil', 'panas', 'kasar', 'kotor', 'bau', 'retak',
+    'sobek', 'lecet', 'penyok', 'bolong', 'kurang', 'tidak',
+    'jangan', 'kapok', 'rugi', 'bohong', 'menipu', 'tipu',
+    'ngawur', 'jelek', 'menyesal', 'nyesel', 'bangsat'
+]
+
 def clean_text(text):
     """Fungsi cleaning text"""
     if pd.isna(text):
@@ -16,6 +37,27 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
+def get_common_words(word_freq):
+    """Filter kata yang umum (panjang > 2, frekuensi > 2)"""
+    return {word: freq for word, freq in word_freq.items() 
+            if len(word) > 2 and freq > 2}
+
+def categorize_words(common_words):
+    """Kategorikan kata umum menjadi kata positif, negatif, dan netral"""
+    positive_words = {}
+    negative_words = {}
+    neutral_words = {}
+    
+    for word, freq in common_words.items():
+        if word in POSITIVE_KEYWORDS:
+            positive_words[word] = freq
+        elif word in NEGATIVE_KEYWORDS:
+            negative_words[word] = freq
+        elif freq > 5:  # Kata yang sering muncul tapi netral
+            neutral_words[word] = freq
+    
+    return positive_words, negative_words, neutral_words
+
 def train_model():
     """Train model dari file CSV yang ada di folder root"""
     print("🔍 Mencari file CSV untuk training...")
@@ -86,46 +128,14 @@ def train_model():
     word_freq = Counter(words)
     
     # Filter kata yang umum
-    common_words = {word: freq for word, freq in word_freq.items() 
-                    if len(word) > 2 and freq > 2}
+    common_words = get_common_words(word_freq)
     
     print(f"\n📊 Statistik Kata:")
     print(f"   - Total kata unik: {len(word_freq)}")
     print(f"   - Kata umum (panjang > 2, frekuensi > 2): {len(common_words)}")
     
     # Kategorikan kata berdasarkan konteks
-    positive_keywords = [
-        'bagus', 'baik', 'suka', 'puas', 'mantap', 'recommended',
-        'cepat', 'murah', 'berkualitas', 'sempurna', 'original',
-        'memuaskan', 'top', 'terbaik', 'ramah', 'aman', 'rapih',
-        'senang', 'hebat', 'luar', 'biasa', 'wow', 'keren', 'cocok',
-        'pas', 'sesuai', 'lengkap', 'enak', 'nyaman', 'lembut',
-        'halus', 'tepat', 'amanah', 'sukses', 'salut', 'jempol',
-        'gemess', 'lucu', 'cantik', 'imut', 'gemes', 'recommended'
-    ]
-    
-    negative_keywords = [
-        'buruk', 'jelek', 'kecewa', 'lambat', 'mahal', 'rusak',
-        'cacat', 'mengecewakan', 'palsu', 'gagal', 'error',
-        'bermasalah', 'reject', 'komplain', 'salah', 'tipis',
-        'kecil', 'panas', 'kasar', 'kotor', 'bau', 'retak',
-        'sobek', 'lecet', 'penyok', 'bolong', 'kurang', 'tidak',
-        'jangan', 'kapok', 'rugi', 'bohong', 'menipu', 'tipu',
-        'ngawur', 'jelek', 'menyesal', 'nyesel', 'bangsat'
-    ]
-    
-    # Hitung frekuensi kata positif/negatif
-    positive_words = {}
-    negative_words = {}
-    neutral_words = {}
-    
-    for word, freq in common_words.items():
-        if word in positive_keywords:
-            positive_words[word] = freq
-        elif word in negative_keywords:
-            negative_words[word] = freq
-        elif freq > 5:  # Kata yang sering muncul tapi netral
-            neutral_words[word] = freq
+    positive_words, negative_words, neutral_words = categorize_words(common_words)
     
     print(f"\n🎯 Kategori Kata:")
     print(f"   - Kata Positif: {len(positive_words)}")